@@ -0,0 +1,332 @@
+"""
+Runtime helpers shared by generated behave step definitions.
+
+Automation_script.py copies this module into the behave features directory, which behave
+puts on sys.path, so environment.py and the steps can `from bdd_runtime import ...`.
+"""
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock still serializes threads
+    fcntl = None
+
+# JSON Lines file the Then steps record into; the runner can point workers at separate files
+RESULT_FILE_ENV = "BDD_RESULT_FILE"
+DEFAULT_RESULT_FILE = "test_result.jsonl"
+
+_result_lock = threading.Lock()
+
+CommandResult = namedtuple("CommandResult", ["stdout", "stderr", "returncode"])
+
+HTTP_POOL_SIZE = int(os.environ.get("BDD_HTTP_POOL_SIZE", "10"))
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def result_file_path() -> str:
+    return os.environ.get(RESULT_FILE_ENV) or DEFAULT_RESULT_FILE
+
+def record_result(lookup_key: str, actual_value, expected_value=None, **fields):
+    """
+    Appends one verification record as a single JSON line. The line is written with one
+    O_APPEND write under a file lock, so concurrent scenarios never interleave or lose records.
+    """
+    record = {"lookup_key": lookup_key, "expected_value": expected_value, "actual_value": actual_value}
+    record.update(fields)
+    line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    with _result_lock:
+        fd = os.open(result_file_path(), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, line)
+        finally:
+            os.close(fd)  # Closing releases the flock
+    return record
+
+def record_stats(record_type: str, stats: dict):
+    """Appends a run statistics record; the final report sums these instead of checking them."""
+    return record_result(None, None, record_type=record_type, **stats)
+
+class CommandExecutor:
+    """
+    Runs the config's `commands` templates for one test run and memoizes their output by
+    the rendered command line for `ttl_seconds`. Concurrent calls for the same command share
+    one execution. Settings come from the optional `command_cache` section of the config:
+
+        command_cache:
+          enabled: true
+          ttl_seconds: 30
+          uncached: [get_minikube_status]   # command keys that always run
+
+    With a ClusterSnapshot, snapshot-eligible command keys are answered from it without running.
+    """
+
+    def __init__(self, test_config: dict = None, timeout: float = 120, snapshot=None):
+        test_config = test_config or {}
+        self.snapshot = snapshot
+        settings = test_config.get("command_cache") or {}
+        self.commands = test_config.get("commands") or {}
+        self.enabled = settings.get("enabled", True)
+        self.ttl = float(settings.get("ttl_seconds", 30))
+        self.uncached = set(settings.get("uncached") or [])
+        self.timeout = timeout
+        self._entries = {}    # rendered command -> (expires_at, CommandResult)
+        self._in_flight = {}  # rendered command -> Future of the running call
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.coalesced = self.bypassed = self.snapshot_answers = 0
+
+    def run(self, command_key: str, **params) -> CommandResult:
+        """Renders `commands[command_key]` with `params` and runs it (or returns the memoized result)."""
+        if self.snapshot is not None:
+            result = self.snapshot.answer(command_key, params.get("label"), params.get("namespace"))
+            if result is not None:
+                with self._lock:
+                    self.snapshot_answers += 1
+                return result
+        command = self.commands[command_key].format(**params)
+        return self.run_command(command, cache=self.enabled and command_key not in self.uncached)
+
+    def run_command(self, command: str, cache: bool = True) -> CommandResult:
+        if not cache:
+            with self._lock:
+                self.bypassed += 1
+            return self._execute(command)
+
+        with self._lock:
+            entry = self._entries.get(command)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            future = self._in_flight.get(command)
+            is_owner = future is None
+            if is_owner:
+                future = self._in_flight[command] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = self._execute(command)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[command]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._entries[command] = (time.monotonic() + self.ttl, result)
+            del self._in_flight[command]
+        future.set_result(result)
+        return result
+
+    def _execute(self, command: str) -> CommandResult:
+        completed = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=self.timeout)
+        return CommandResult(completed.stdout, completed.stderr, completed.returncode)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "uncached": self.bypassed,
+                    "snapshot": self.snapshot_answers}
+
+def http_session():
+    """One keep-alive requests.Session per run, so steps reuse connections instead of reconnecting."""
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+    return _http_session
+
+class ApiClient:
+    """HTTP calls against the config's `api_base_url` over the pooled session."""
+
+    def __init__(self, base_url: str = None, timeout: float = 30):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = timeout
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return http_session().request(method, self.url(path), **kwargs)
+
+    def get(self, path: str, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path: str, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path: str, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+def _drain(stream):
+    for _ in stream:
+        pass
+
+class KubeClient:
+    """
+    Kubernetes reads through one long-lived `kubectl proxy` instead of a kubectl process
+    per step. The proxy starts on first use and its connection is reused through the pooled
+    session. Pass `proxy_url` (or set KUBE_PROXY_URL) to use an existing proxy or a stub server.
+    If the proxy can't be reached, calls fall back to `kubectl get ... -o json`.
+    """
+
+    def __init__(self, proxy_url: str = None, kubectl: str = "kubectl", timeout: float = 30):
+        self.proxy_url = (proxy_url or os.environ.get("KUBE_PROXY_URL") or "").rstrip("/") or None
+        self.kubectl = kubectl
+        self.timeout = timeout
+        self._process = None
+        self._proxy_failed = False
+        self._lock = threading.Lock()
+
+    def _start_proxy(self):
+        # --port=0 picks a free port; the first line reads "Starting to serve on 127.0.0.1:<port>"
+        process = subprocess.Popen([self.kubectl, "proxy", "--port=0"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        lines = []
+        reader = threading.Thread(target=lambda: lines.append(process.stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(self.timeout)
+        first_line = lines[0] if lines else f"no output within {self.timeout}s"
+        match = re.search(r"serve on ([\w.\-\[\]:]+:\d+)", first_line)
+        if not match:
+            process.kill()
+            raise RuntimeError(f"kubectl proxy did not start: {first_line.strip()}")
+        # Keep reading the proxy's log so it never blocks on a full pipe
+        threading.Thread(target=_drain, args=(process.stdout,), daemon=True).start()
+        self._process = process
+        self.proxy_url = f"http://{match.group(1)}"
+
+    def _base_url(self):
+        with self._lock:
+            if self.proxy_url is None and not self._proxy_failed:
+                try:
+                    self._start_proxy()
+                except (OSError, RuntimeError):
+                    self._proxy_failed = True
+            return self.proxy_url
+
+    def get(self, path: str, **params) -> dict:
+        """GETs a Kubernetes API path (e.g. /api/v1/namespaces/default/pods) and returns the JSON."""
+        base_url = self._base_url()
+        if base_url is None:
+            raise ConnectionError("kubectl proxy is not available")
+        response = http_session().get(f"{base_url}/{path.lstrip('/')}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def get_pods(self, label_selector: str = None, namespace: str = "default") -> dict:
+        """Same JSON as `kubectl get pods -l <label_selector> -n <namespace> -o json` (namespace None: all)."""
+        path = f"/api/v1/namespaces/{namespace}/pods" if namespace else "/api/v1/pods"
+        params = {"labelSelector": label_selector} if label_selector else {}
+        try:
+            return self.get(path, **params)
+        except OSError:  # Includes requests' connection and HTTP errors
+            command = [self.kubectl, "get", "pods", "-o", "json"]
+            command += ["-l", label_selector] if label_selector else []
+            command += ["-n", namespace] if namespace else ["--all-namespaces"]
+            completed = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            if completed.returncode != 0:
+                raise RuntimeError(completed.stderr.strip() or f"{' '.join(command)} failed")
+            return json.loads(completed.stdout)
+
+    def close(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=5)
+            self._process = None
+
+class ClusterSnapshot:
+    """
+    All pods from one `kubectl get pods -A -o json`, indexed by namespace and by label, so a
+    feature's per-scenario pod queries cost one API call. Enabled in the config with
+
+        cluster_snapshot:
+          enabled: true
+          commands:                      # command key -> output it stands in for
+            get_pod_json_by_label: json  # kubectl get pod -l {label} -n {namespace} -o json
+            get_pod_stats: phase         # ... -o jsonpath='{.items[0].status.phase}'
+
+    The snapshot is taken once in before_all, so it doesn't see pods that change during the run.
+    """
+
+    VIEWS = ("json", "phase")
+
+    def __init__(self, pods: list, commands: dict = None):
+        self.pods = pods
+        self.commands = {key: view for key, view in (commands or {}).items() if view in self.VIEWS}
+        self.by_namespace = {}
+        self.by_label = {}
+        for index, pod in enumerate(pods):
+            metadata = pod.get("metadata") or {}
+            self.by_namespace.setdefault(metadata.get("namespace"), set()).add(index)
+            for label in (metadata.get("labels") or {}).items():
+                self.by_label.setdefault(label, set()).add(index)
+
+    @classmethod
+    def fetch(cls, kube_client, commands: dict = None):
+        return cls(kube_client.get_pods(label_selector=None, namespace=None).get("items") or [], commands)
+
+    def select(self, label_selector: str = None, namespace: str = None):
+        """
+        Pods matching an equality-based selector ("app=web,tier=api"); None if the selector needs
+        the API. Without a namespace, like kubectl without -n, only "default" is searched.
+        """
+        matches = set(self.by_namespace.get(namespace or "default", ()))
+        for requirement in filter(None, (part.strip() for part in (label_selector or "").split(","))):
+            key, separator, value = requirement.partition("==" if "==" in requirement else "=")
+            if not separator or "!" in key or " " in key.strip():
+                return None  # !=, in (...), exists checks: not answered from the index
+            matches &= self.by_label.get((key.strip(), value.strip()), set())
+        return [self.pods[index] for index in sorted(matches)]
+
+    def answer(self, command_key: str, label_selector: str = None, namespace: str = None):
+        """The CommandResult the command would produce, or None when it must really run."""
+        view = self.commands.get(command_key)
+        if view is None:
+            return None
+        pods = self.select(label_selector, namespace)
+        if pods is None:
+            return None
+        if view == "json":
+            return CommandResult(json.dumps({"apiVersion": "v1", "kind": "List", "items": pods, "metadata": {}}, indent=4), "", 0)
+        if not pods:
+            return CommandResult("", "error: error executing jsonpath: array index out of bounds", 1)
+        return CommandResult((pods[0].get("status") or {}).get("phase", ""), "", 0)
+
+def take_cluster_snapshot(test_config: dict, kube_client):
+    """
+    ClusterSnapshot for the config's `cluster_snapshot` section, or None when it is disabled or
+    the pods can't be listed (no kubectl, cluster unreachable); the commands then really run.
+    """
+    settings = (test_config or {}).get("cluster_snapshot") or {}
+    if not settings.get("enabled"):
+        return None
+    try:
+        snapshot = ClusterSnapshot.fetch(kube_client, settings.get("commands"))
+    except (OSError, RuntimeError, ValueError, subprocess.SubprocessError) as error:
+        print(f"Cluster snapshot unavailable, running commands instead: {error}")
+        return None
+    print(f"Cluster snapshot: {len(snapshot.pods)} pods in {len(snapshot.by_namespace)} namespaces")
+    return snapshot
@@ -0,0 +1,390 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+
+def case(name, source, expected, fixes):
+    return pytest.param(dedent(source), dedent(expected), fixes, id=name)
+
+
+PYTHON_CASES = [
+    case("unused and missing imports", """\
+        import os
+        import json
+        from behave import given
+
+        @given('a step')
+        def step_impl(context):
+            context.value = json.loads("{}")
+            yaml.safe_load("a: 1")
+        """, """\
+        import json
+        from behave import given
+        import yaml
+
+        @given('a step')
+        def step_impl(context):
+            context.value = json.loads("{}")
+            yaml.safe_load("a: 1")
+        """, ["removed unused import 'import os'", "added 'import yaml'"]),
+    case("duplicate step for the same keyword only", """\
+        from behave import given, when
+
+        @given('a step')
+        def first(context):
+            pass
+
+        @given('a step')
+        def second(context):
+            pass
+
+        @when('a step')
+        def third(context):
+            pass
+        """, """\
+        from behave import given, when
+
+        @given('a step')
+        def first(context):
+            pass
+
+
+        @when('a step')
+        def third(context):
+            pass
+        """, ["removed duplicate step definition second() for @given('a step')"]),
+    case("syntax error left alone", "def broken(:\n", "def broken(:\n", []),
+    case("clean code unchanged", """\
+        from behave import then
+
+        @then('it passes')
+        def step_impl(context):
+            assert context.passed
+        """, """\
+        from behave import then
+
+        @then('it passes')
+        def step_impl(context):
+            assert context.passed
+        """, []),
+]
+
+GO_CASES = [
+    case("unused variable with a fresh error", """\
+        package main
+
+        func f() error {
+            n, err := x()
+            return err
+        }
+        """, """\
+        package main
+
+        func f() error {
+            _, err := x()
+            return err
+        }
+        """, ["blanked unused variable 'n'"]),
+    case("no new variable left in the same block", """\
+        package main
+
+        func f() error {
+            a, err := x()
+            b, err := y()
+            return use(a, err)
+        }
+        """, """\
+        package main
+
+        func f() error {
+            a, err := x()
+            _, err = y()
+            return use(a, err)
+        }
+        """, ["blanked unused variable 'b'"]),
+    case("shadowed variable in an inner block stays a declaration", """\
+        package main
+
+        func f() error {
+            err := a()
+            if true {
+                v, err := y()
+                log(err)
+            }
+            return err
+        }
+        """, """\
+        package main
+
+        func f() error {
+            err := a()
+            if true {
+                _, err := y()
+                log(err)
+            }
+            return err
+        }
+        """, ["blanked unused variable 'v'"]),
+    case("if header variable is not in scope afterwards", """\
+        package main
+
+        func f() error {
+            if _, err := y(); err != nil {
+                return err
+            }
+            w, err := z()
+            return err
+        }
+        """, """\
+        package main
+
+        func f() error {
+            if _, err := y(); err != nil {
+                return err
+            }
+            _, err := z()
+            return err
+        }
+        """, ["blanked unused variable 'w'"]),
+    case("parameter is already declared", """\
+        package main
+
+        func f(err error) error {
+            v, err := y()
+            return err
+        }
+        """, """\
+        package main
+
+        func f(err error) error {
+            _, err = y()
+            return err
+        }
+        """, ["blanked unused variable 'v'"]),
+    case("closure parameter is already declared", """\
+        package main
+
+        func f() error {
+            handler := func(err error) error {
+                v, err := y()
+                return err
+            }
+            return handler(nil)
+        }
+        """, """\
+        package main
+
+        func f() error {
+            handler := func(err error) error {
+                _, err = y()
+                return err
+            }
+            return handler(nil)
+        }
+        """, ["blanked unused variable 'v'"]),
+    case("unused range variables", """\
+        package main
+
+        func f(m map[string]int) {
+            for k, v := range m {
+                log(v)
+            }
+            for i, x := range m {
+            }
+        }
+        """, """\
+        package main
+
+        func f(m map[string]int) {
+            for _, v := range m {
+                log(v)
+            }
+            for range m {
+            }
+        }
+        """, ["blanked unused loop variable 'k'", "blanked unused loop variable 'i'", "blanked unused loop variable 'x'"]),
+    case("import block rebuilt from usage", """\
+        package main
+
+        import (
+            "fmt"
+            "os"
+            "github.com/cucumber/godog"
+        )
+
+        func aStep() error {
+            import "strconv"
+            n, err := strconv.Atoi("1")
+            if err != nil {
+                return err
+            }
+            return fmt.Errorf("%d %s", n, strings.ToUpper("x"))
+        }
+
+        func InitializeScenario(ctx *godog.ScenarioContext) {
+            ctx.Step(`^a step$`, aStep)
+            ctx.Step(`^a step$`, aStep)
+        }
+        """, """\
+        package main
+
+        import (
+            "fmt"
+            "github.com/cucumber/godog"
+            "strconv"
+            "strings"
+        )
+
+        func aStep() error {
+            n, err := strconv.Atoi("1")
+            if err != nil {
+                return err
+            }
+            return fmt.Errorf("%d %s", n, strings.ToUpper("x"))
+        }
+
+        func InitializeScenario(ctx *godog.ScenarioContext) {
+            ctx.Step(`^a step$`, aStep)
+        }
+        """, ['moved import "strconv" to the import block', "removed duplicate step registration `^a step$`",
+              'removed unused import "os"', 'added import "strings"']),
+    case("local variable named like a package, and names inside strings", """\
+        package main
+
+        import (
+            "fmt"
+        )
+
+        func aStep() error {
+            strings := []string{"a"}
+            fmt.Println("os.Exit in a string")
+            return fmt.Errorf("%v", strings)
+        }
+        """, """\
+        package main
+
+        import (
+            "fmt"
+        )
+
+        func aStep() error {
+            strings := []string{"a"}
+            fmt.Println("os.Exit in a string")
+            return fmt.Errorf("%v", strings)
+        }
+        """, []),
+]
+
+JAVA_CASES = [
+    case("unused imports are kept", """\
+        package stepdefinitions;
+
+        import java.util.List;
+        import java.util.Map;
+        import io.cucumber.java.en.Given;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() {
+                List<String> names = null;
+            }
+        }
+        """, """\
+        package stepdefinitions;
+
+        import java.util.List;
+        import java.util.Map;
+        import io.cucumber.java.en.Given;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() {
+                List<String> names = null;
+            }
+        }
+        """, []),
+    case("missing imports added, names in comments and strings ignored", """\
+        package stepdefinitions;
+
+        import io.cucumber.java.en.Given;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() throws Exception {
+                JsonNode node = new ObjectMapper().readTree("{}");
+                // a List in a comment
+                String s = "Map in a string";
+            }
+        }
+        """, """\
+        package stepdefinitions;
+
+        import io.cucumber.java.en.Given;
+        import com.fasterxml.jackson.databind.ObjectMapper;
+        import com.fasterxml.jackson.databind.JsonNode;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() throws Exception {
+                JsonNode node = new ObjectMapper().readTree("{}");
+                // a List in a comment
+                String s = "Map in a string";
+            }
+        }
+        """, ["added import com.fasterxml.jackson.databind.ObjectMapper", "added import com.fasterxml.jackson.databind.JsonNode"]),
+    case("doubled import repaired, wildcard covers the package, duplicate step removed", """\
+        package stepdefinitions;
+
+        import import java.util.*;;
+        import io.cucumber.java.en.Given;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() {
+                List<String> names = new ArrayList<>();
+            }
+
+            @Given("a step")
+            public void aStepAgain() {
+                if (true) { names(); }
+            }
+        }
+        """, """\
+        package stepdefinitions;
+
+        import java.util.*;
+        import io.cucumber.java.en.Given;
+
+        public class StepDefinitions {
+            @Given("a step")
+            public void aStep() {
+                List<String> names = new ArrayList<>();
+            }
+
+        }
+        """, ["repaired 1 doubled import statement(s)", 'removed duplicate step definition for "a step"']),
+]
+
+
+@pytest.mark.parametrize("source, expected, fixes", PYTHON_CASES)
+def test_autofix_python(source, expected, fixes):
+    assert Automation_script.autofix_python(source) == (expected, fixes)
+
+
+@pytest.mark.parametrize("source, expected, fixes", GO_CASES)
+def test_autofix_go(source, expected, fixes):
+    assert Automation_script.autofix_go(source) == (expected, fixes)
+
+
+@pytest.mark.parametrize("source, expected, fixes", JAVA_CASES)
+def test_autofix_java(source, expected, fixes):
+    assert Automation_script.autofix_java(source) == (expected, fixes)
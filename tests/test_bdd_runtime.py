@@ -0,0 +1,93 @@
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import bdd_runtime  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers pod lists like the API server behind `kubectl proxy`, and echoes everything else."""
+
+    pods = {"default": [{"metadata": {"name": "web-1", "namespace": "default", "labels": {"app": "web"}}}]}
+
+    def do_GET(self):
+        if self.path.startswith("/api/v1/namespaces/"):
+            namespace = self.path.split("/")[4]
+            self.reply({"kind": "PodList", "items": self.pods.get(namespace, []), "path": self.path})
+        else:
+            self.reply({"method": "GET", "path": self.path})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.reply({"method": "POST", "path": self.path, "body": json.loads(body or "null")})
+
+    def reply(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_kube_client_reads_pods_through_proxy_url(stub_server, monkeypatch):
+    monkeypatch.setenv("KUBE_PROXY_URL", stub_server)
+    pods = bdd_runtime.KubeClient().get_pods("app=web", "default")
+    assert [p["metadata"]["name"] for p in pods["items"]] == ["web-1"]
+    assert pods["path"] == "/api/v1/namespaces/default/pods?labelSelector=app%3Dweb"
+
+
+def test_api_client_uses_base_url(stub_server):
+    api = bdd_runtime.ApiClient(stub_server + "/")
+    assert api.get("/health").json() == {"method": "GET", "path": "/health"}
+    assert api.post("items", json={"id": 1}).json() == {"method": "POST", "path": "/items", "body": {"id": 1}}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses a shell script as kubectl")
+def test_kube_proxy_start_is_bounded(tmp_path, monkeypatch):
+    # A kubectl whose proxy never prints must not hang the run; the client falls back to kubectl get
+    silent_kubectl = tmp_path / "kubectl"
+    silent_kubectl.write_text("#!/bin/sh\nexec sleep 30\n")
+    silent_kubectl.chmod(0o755)
+    monkeypatch.delenv("KUBE_PROXY_URL", raising=False)
+    client = bdd_runtime.KubeClient(kubectl=str(silent_kubectl), timeout=0.5)
+    assert client._base_url() is None
+
+
+def pod(name, namespace, **labels):
+    return {"metadata": {"name": name, "namespace": namespace, "labels": labels}, "status": {"phase": "Running"}}
+
+
+def test_select_without_namespace_searches_default_only():
+    # kubectl get pod -l app=web without -n only looks in the current (default) namespace
+    snapshot = bdd_runtime.ClusterSnapshot([pod("a", "default", app="web"), pod("b", "kube-system", app="web")])
+    assert [p["metadata"]["name"] for p in snapshot.select("app=web")] == ["a"]
+    assert [p["metadata"]["name"] for p in snapshot.select("app=web", "kube-system")] == ["b"]
+
+
+def test_snapshot_falls_back_when_pods_cannot_be_listed():
+    class UnreachableCluster:
+        def get_pods(self, label_selector=None, namespace="default"):
+            raise FileNotFoundError("kubectl")
+
+    config = {"cluster_snapshot": {"enabled": True, "commands": {"get_pod_json_by_label": "json"}}}
+    assert bdd_runtime.take_cluster_snapshot(config, UnreachableCluster()) is None
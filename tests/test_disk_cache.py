@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = Automation_script.DiskLRUCache(tmp_path, 2)
+    cache.put("a", {"value": 1})
+    cache.put("b", {"value": 2})
+    assert cache.get("a") == {"value": 1}
+    cache.put("c", {"value": 3})
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["a", "c"]
+
+
+def test_entries_from_an_earlier_run_are_evicted_oldest_first(tmp_path):
+    for age, key in enumerate(["old", "new"]):
+        (tmp_path / f"{key}.json").write_text("{}")
+        os.utime(tmp_path / f"{key}.json", (1000 + age, 1000 + age))
+    cache = Automation_script.DiskLRUCache(tmp_path, 2)
+    for key in ["x", "y", "z"]:
+        cache.put(key, {})
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["y", "z"]
+
+
+def test_directory_scans_are_amortized(tmp_path, monkeypatch):
+    scans = []
+    original_glob = Path.glob
+    monkeypatch.setattr(Path, "glob", lambda self, pattern: scans.append(pattern) or original_glob(self, pattern))
+    cache = Automation_script.DiskLRUCache(tmp_path, 100)
+    for index in range(30):
+        cache.put(f"key{index}", {})
+    assert len(scans) == 3  # The first write, then every max_entries // 10 writes
+
+
+def test_entries_from_other_processes_count_toward_the_limit(tmp_path):
+    # Two caches on one directory stand in for two generator runs sharing BDD_CACHE_DIR
+    this_run, other_run = Automation_script.DiskLRUCache(tmp_path, 20), Automation_script.DiskLRUCache(tmp_path, 20)
+    for index in range(40):
+        (this_run if index % 2 else other_run).put(f"key{index}", {})
+    assert len(list(tmp_path.glob("*.json"))) <= 20 + 20 // 10
@@ -0,0 +1,116 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import Automation_script  # noqa: E402
+
+
+def sample(name):
+    return (REPO_ROOT / "input_file" / name).read_text(encoding="utf-8")
+
+
+def test_sample_without_trailing_newline():
+    scenarios = Automation_script.parse_feature_by_scenario(sample("pod.feature"))
+    assert [scenario["title"] for scenario in scenarios] == ["Scenario: Check if the pod is in Running state"]
+    assert scenarios[0]["line"] == 2
+    assert scenarios[0]["steps"] == [
+        "Given the mini Kube cluster is accessible",
+        'When I check the status of the pod with label "app=flask-api"',
+        'Then the pod status should be "Running"',
+    ]
+
+
+def test_sample_scenarios_keep_their_source():
+    content = sample("users.feature")
+    scenarios = Automation_script.parse_feature_by_scenario(content)
+    assert [scenario["title"] for scenario in scenarios] == [
+        "Scenario: Get all users", "Scenario: Get user by id",
+        "Scenario: Get non-existent user", "Scenario: Add a new user",
+    ]
+    assert [scenario["line"] for scenario in scenarios] == [3, 10, 16, 22]
+    last = scenarios[-1]
+    assert last["content"].splitlines()[0].strip() == "Scenario: Add a new user"
+    assert last["content"].splitlines()[-1].strip() == 'And the response should contain "Charlie"'
+    assert last["steps"][1] == 'And I have a JSON payload with name "Charlie"'
+
+
+def test_sample_outline_examples():
+    feature = Automation_script.parse_gherkin(sample("user.feature"))
+    outline = feature.scenarios[0]
+    assert isinstance(outline, Automation_script.ScenarioOutline)
+    assert outline.keyword == "Scenario Outline"
+    assert [examples.header for examples in outline.examples] == [["user_id", "user_name"]]
+    assert [cells for _, cells in outline.examples[0].rows] == [["1", "Alice"], ["2", "Bob"]]
+    assert outline.end_line == 12
+    assert Automation_script.outline_example_values(outline) == {"user_id": "1", "user_name": "Alice"}
+
+
+BACKGROUND_AND_RULES = """\
+@cluster
+Feature: Pods
+  Checks pods across namespaces.
+
+  Background:
+    Given the cluster is reachable
+
+  Scenario: Default namespace
+    Then 3 pods are running
+
+  @system
+  Rule: System pods
+    Background:
+      Given the namespace is "kube-system"
+
+    @dns
+    Scenario: DNS
+      When I list pods with label "k8s-app=kube-dns"
+      Then every pod has a config:
+        \"\"\"
+        replicas: 2
+        \"\"\"
+      And the pods are:
+        | name      | phase   |
+        | coredns-1 | Running |
+"""
+
+
+def test_background_is_prepended_and_rules_add_their_own():
+    scenarios = Automation_script.parse_feature_by_scenario(BACKGROUND_AND_RULES)
+    assert [scenario["steps"] for scenario in scenarios] == [
+        ["Given the cluster is reachable", "Then 3 pods are running"],
+        ["Given the cluster is reachable", 'Given the namespace is "kube-system"',
+         'When I list pods with label "k8s-app=kube-dns"', "Then every pod has a config:", "And the pods are:"],
+    ]
+
+
+def test_tags_descriptions_doc_strings_and_tables():
+    feature = Automation_script.parse_gherkin(BACKGROUND_AND_RULES)
+    assert feature.tags == ["@cluster"]
+    assert feature.description == ["Checks pods across namespaces."]
+    rule = feature.rules[0]
+    dns = rule.scenarios[0]
+    assert dns.tags == ["@cluster", "@system", "@dns"]
+    assert dns.steps[1].doc_string == "replicas: 2"
+    assert dns.steps[2].data_table == [["name", "phase"], ["coredns-1", "Running"]]
+    assert dns.end_line == len(BACKGROUND_AND_RULES.splitlines())
+
+
+@pytest.mark.parametrize("content, line", [
+    ("Feature: A\n  Scenario: B\n    Given x\n  Background:\n    Given y\n", 4),
+    ("Feature: A\n  Scenario: B\n    Given x\n  Examples:\n    | a |\n", 4),
+    ("Feature: A\n  Given x\n", 2),
+    ("Feature: A\n  Scenario: B\n    Given x\n      \"\"\"\n      never closed\n", 4),
+    ("Feature: A\n  Scenario: B\n    Given x\n@orphan\n", 4),
+    ("Feature: A\nFeature: B\n", 2),
+])
+def test_malformed_gherkin_reports_the_line(content, line):
+    with pytest.raises(Automation_script.GherkinError) as error:
+        Automation_script.parse_gherkin(content)
+    assert error.value.line == line
@@ -0,0 +1,110 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+STEPS = [{"func_name": "step_cluster_reachable"}, {"func_name": "step_pod_running"}]
+
+BEHAVE_CODE = """\
+from behave import given, then
+import yaml
+
+@given('the cluster is reachable')
+def step_cluster_reachable(context):
+    context.ok = True
+
+@then('the pod is running')
+def step_pod_running(context):
+    assert context.phase == "Running"
+"""
+
+GODOG_CODE = """\
+package main
+
+import (
+    "fmt"
+)
+
+type scenarioContext struct {
+    phase string
+}
+
+func (s *scenarioContext) step_cluster_reachable() error {
+    return nil
+}
+
+func (s *scenarioContext) step_pod_running() error {
+    return fmt.Errorf("phase %s", phase)
+}
+"""
+
+CUCUMBER_CODE = """\
+package stepdefinitions;
+
+import io.cucumber.java.en.Given;
+import io.cucumber.java.en.Then;
+
+public class StepDefinitions {
+    private String phase;
+
+    @Given("the cluster is reachable")
+    public void step_cluster_reachable() {
+        phase = null;
+    }
+
+    @Then("the pod is running")
+    public void step_pod_running() {
+        Assert.assertEquals("Running", phse);
+    }
+}
+"""
+
+CASES = [
+    pytest.param("behave", BEHAVE_CODE, """\
+RUNTIME_CRASH_FAILED: Traceback Summary (most relevant parts):
+  File "features/steps/step_definitions.py", line 10, in <module>
+...
+AttributeError: 'Context' object has no attribute 'phase'""", {"step_pod_running"}, id="behave traceback"),
+    pytest.param("behave", BEHAVE_CODE, "STATIC_CHECK_FAILED: invalid syntax (<unknown>, line 6)",
+                 {"step_cluster_reachable"}, id="behave syntax error"),
+    pytest.param("behave", BEHAVE_CODE, "FAILED: Then the pod is running (features/pod.feature:5)\n    in step_pod_running",
+                 {"step_pod_running"}, id="behave step name"),
+    pytest.param("behave", BEHAVE_CODE, 'RUNTIME_CRASH_FAILED:\n  File "features/steps/step_definitions.py", line 2\nModuleNotFoundError: yaml',
+                 set(), id="behave import outside the steps"),
+    pytest.param("godog", GODOG_CODE, "CODE_COMPILATION_FAILED: Go vet failed:\n# validation\n./steps_test.go:16:39: undefined: phase",
+                 {"step_pod_running"}, id="go vet"),
+    pytest.param("godog", GODOG_CODE, "CODE_COMPILATION_FAILED: gofmt: steps_test.go:12:12: expected ';', found 'nil'",
+                 {"step_cluster_reachable"}, id="gofmt"),
+    pytest.param("godog", GODOG_CODE, './steps_test.go:4:5: "fmt" imported and not used\n./steps_test.go:16:39: undefined: phase',
+                 set(), id="go error in the import block"),
+    pytest.param("cucumber", CUCUMBER_CODE, """\
+CODE_COMPILATION_FAILED: Maven compilation failed:
+[ERROR] /tmp/sandbox/src/test/java/stepdefinitions/StepDefinitions.java:[16,9] cannot find symbol
+  symbol:   variable Assert
+[ERROR] /tmp/sandbox/src/test/java/stepdefinitions/StepDefinitions.java:[16,47] cannot find symbol
+  symbol:   variable phse""", {"step_pod_running"}, id="javac"),
+    pytest.param("cucumber", CUCUMBER_CODE, "StepDefinitions.java:11: error: ';' expected\n        phase = null",
+                 {"step_cluster_reachable"}, id="javac plain format"),
+    pytest.param("cucumber", CUCUMBER_CODE, "StepDefinitions.java:[7,5] cannot find symbol", set(), id="javac field declaration"),
+]
+
+
+@pytest.mark.parametrize("framework, code, message, expected", CASES)
+def test_localize_step_errors(framework, code, message, expected):
+    step_errors = Automation_script.localize_step_errors(message, code, framework, STEPS)
+    assert set(step_errors) == expected
+    assert all(error == message for error in step_errors.values())
+
+
+def test_long_errors_keep_the_end():
+    message = "x" * Automation_script.STEP_REPAIR_ERROR_CHARS + ' step_definitions.py", line 10'
+    step_errors = Automation_script.localize_step_errors(message, BEHAVE_CODE, "behave", STEPS)
+    assert step_errors["step_pod_running"].endswith('line 10')
+    assert len(step_errors["step_pod_running"]) == Automation_script.STEP_REPAIR_ERROR_CHARS
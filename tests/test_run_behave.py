@@ -0,0 +1,79 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Keep the module's caches and sandboxes out of the working tree
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+FEATURE = """Feature: Runner
+  Scenario: passes
+    Given nothing happens
+"""
+
+STEPS = """from behave import given
+
+@given('nothing happens')
+def nothing_happens(context):
+    pass
+"""
+
+
+def write_project(root: Path) -> Path:
+    (root / "features" / "steps").mkdir(parents=True)
+    (root / "features" / "runner.feature").write_text(FEATURE)
+    (root / "features" / "steps" / "steps.py").write_text(STEPS)
+    return root
+
+
+def test_run_behave_without_timeout(tmp_path):
+    # The extraction run passes timeout=None: it must wait instead of failing on the deadline
+    result = Automation_script.run_behave(write_project(tmp_path), timeout=None)
+    assert result["passed"], result
+    assert not result["crashed"]
+
+
+def test_run_behave_without_timeout_in_subprocess_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(Automation_script, "BEHAVE_RUNNER_MODE", "subprocess")
+    result = Automation_script.run_behave(write_project(tmp_path), timeout=None)
+    assert result["passed"], result
+
+
+def test_run_behave_with_other_threads_running(tmp_path):
+    # Validation runs while the RAG init thread and worker pools are alive; children must
+    # come from the single-threaded forkserver, not from this process
+    release = threading.Event()
+    worker = threading.Thread(target=release.wait)
+    worker.start()
+    try:
+        result = Automation_script.run_behave(write_project(tmp_path), timeout=30)
+    finally:
+        release.set()
+        worker.join()
+    assert Automation_script.behave_fork_context().get_start_method() == "forkserver"
+    assert result["passed"], result
+
+
+def test_run_behave_reports_worker_exit_code(tmp_path, monkeypatch):
+    # A worker that dies without sending results is reported with its real exit code
+    monkeypatch.setattr(Automation_script, "_behave_child", os._exit)
+    result = Automation_script.run_behave(write_project(tmp_path), timeout=30)
+    assert result["crashed"]
+    assert "exit code None" not in result["load_error"], result["load_error"]
+
+
+def test_after_all_survives_a_failed_before_all(tmp_path):
+    # The config is missing, so before_all raises before any client exists
+    project = write_project(tmp_path)
+    environment = Automation_script.env_template.format(user_config_filename="missing_config.yaml")
+    (project / "features" / "environment.py").write_text(environment)
+    shutil.copy(Automation_script.BDD_RUNTIME_MODULE, project / "features")
+    result = Automation_script.run_behave(project, timeout=30)
+    assert not result["passed"]
+    assert "FileNotFoundError" in result["output"]
+    assert "AttributeError" not in result["output"]
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+
+def test_sandboxes_are_reused_within_a_pool(tmp_path):
+    pool = Automation_script.SandboxPool(tmp_path)
+    with pool.acquire("behave") as first:
+        with pool.acquire("behave") as second:
+            assert first.root != second.root
+    with pool.acquire("behave") as again:
+        assert again.root in (first.root, second.root)
+
+
+@pytest.mark.skipif(Automation_script.fcntl is None, reason="sandbox directories are locked with flock")
+def test_concurrent_runs_get_separate_sandboxes(tmp_path):
+    # flock locks belong to the open file, so a second pool behaves like a second generator run
+    this_run, other_run = Automation_script.SandboxPool(tmp_path), Automation_script.SandboxPool(tmp_path)
+    with this_run.acquire("behave") as ours, other_run.acquire("behave") as theirs:
+        assert ours.root.name == "behave-0"
+        assert theirs.root.name == "behave-1"
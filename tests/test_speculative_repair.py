@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+FIXED_CODE = "x = 1"
+
+
+class SlowLLM:
+    """The first call answers at once with working code; the others take `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if not first:
+            time.sleep(self.delay)
+        return type("Response", (), {"content": FIXED_CODE if first else f"x = {self.calls}"})()
+
+
+def test_returns_without_waiting_for_slower_candidates(monkeypatch):
+    llm = SlowLLM(delay=3)
+    monkeypatch.setattr(Automation_script, "get_llm", lambda: llm)
+    monkeypatch.setattr(Automation_script, "validate_code",
+                        lambda code, *args: (code == FIXED_CODE, "VALIDATION_SUCCESS" if code == FIXED_CODE else "RUNTIME_CRASH_FAILED"))
+    start = time.monotonic()
+    code, message = Automation_script.speculative_repair("x = \n", "SyntaxError", "behave", "Feature: f", {}, candidates=3)
+    assert code == FIXED_CODE
+    assert message == "VALIDATION_SUCCESS"
+    assert time.monotonic() - start < 2
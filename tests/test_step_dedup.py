@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+
+def unique_steps(framework, *step_texts):
+    jobs = [{"step_text": text, "gherkin_keyword": text.split()[0]} for text in step_texts]
+    return [job["step_text"] for job in Automation_script.deduplicate_step_jobs(jobs, framework)]
+
+
+@pytest.mark.parametrize("framework", ["behave", "godog", "cucumber"])
+def test_literals_of_the_same_kind_share_a_definition(framework):
+    assert unique_steps(framework, "Then the status is 200", "Then the status is 404") == ["Then the status is 200"]
+    assert unique_steps(framework, 'Then the pod is "web"', 'Then the pod is "db"') == ['Then the pod is "web"']
+
+
+@pytest.mark.parametrize("framework", ["behave", "godog", "cucumber"])
+def test_quoted_and_bare_literals_stay_separate(framework):
+    # One pattern can't match both: the quoted form's parameter would arrive with or without its quotes
+    steps = ["Then the status is 200", 'Then the status is "201"']
+    assert unique_steps(framework, *steps) == steps
+
+
+@pytest.mark.parametrize("framework", ["behave", "godog", "cucumber"])
+def test_outline_placeholder_shares_with_a_bare_literal(framework):
+    assert unique_steps(framework, "Then the status is <code>", "Then the status is 200") == ["Then the status is <code>"]
+
+
+def test_behave_keeps_keywords_apart():
+    assert len(unique_steps("behave", "Given the status is 200", "Then the status is 200")) == 2
+
+
+@pytest.mark.parametrize("framework, pattern", [
+    ("behave", 'a pod "{name}" has {count} restarts and {num2} pods'),
+    ("godog", 'a pod "([^"]*)" has (.*) restarts and (\\d+) pods'),
+    ("cucumber", "a pod {string} has {} restarts and {word} pods"),
+])
+def test_outline_formatting(framework, pattern):
+    step = 'Given a pod "<name>" has <count> restarts and 2 pods'
+    assert Automation_script.format_step_for_framework(step, framework) == (pattern, ["name", "count", "num2"])
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("BDD_CACHE_DIR", tempfile.mkdtemp(prefix="bdd_cache_"))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import Automation_script  # noqa: E402
+
+
+def validate_twice(monkeypatch, tmp_path, message):
+    monkeypatch.setattr(Automation_script, "validation_result_cache", Automation_script.DiskLRUCache(tmp_path, 10))
+    runs = []
+
+    def run_validation(*args):
+        runs.append(args)
+        return False, message
+
+    monkeypatch.setattr(Automation_script, "run_validation", run_validation)
+    for _ in range(2):
+        Automation_script.validate_code("package main\n", "godog")
+    return len(runs)
+
+
+def test_code_failures_are_stored(monkeypatch, tmp_path):
+    assert validate_twice(monkeypatch, tmp_path, "CODE_COMPILATION_FAILED: Go compilation failed: undefined: foo") == 1
+
+
+def test_timeouts_are_not_stored(monkeypatch, tmp_path):
+    assert validate_twice(monkeypatch, tmp_path, "VALIDATION_TIMEOUT: Test execution timed out (possible infinite loop)") == 2
+
+
+def test_environment_failures_are_not_stored(monkeypatch, tmp_path):
+    go_proxy_error = "CODE_COMPILATION_FAILED: Go mod tidy failed: dial tcp: lookup proxy.golang.org: no such host"
+    maven_error = "CODE_COMPILATION_FAILED: Maven compilation failed:\n[ERROR] Could not resolve dependencies for project"
+    assert validate_twice(monkeypatch, tmp_path, go_proxy_error) == 2
+    assert validate_twice(monkeypatch, tmp_path / "maven", maven_error) == 2
+
+
+def test_worker_and_load_failures_are_not_stored(monkeypatch, tmp_path):
+    worker_crash = "RUNTIME_CRASH_FAILED: behave worker exited unexpectedly (exit code -9)"
+    load_error = "VALIDATION_SETUP_FAILED: behave could not run: ModuleNotFoundError: No module named 'bdd_runtime'"
+    assert validate_twice(monkeypatch, tmp_path, worker_crash) == 2
+    assert validate_twice(monkeypatch, tmp_path / "load", load_error) == 2
+
+
+def test_cluster_failures_are_not_stored(monkeypatch, tmp_path):
+    kubectl_error = ("RUNTIME_CRASH_FAILED: FAILED: Given the pod is running (features/health.feature:4)\n"
+                     "    RuntimeError: The connection to the server localhost:8080 was refused")
+    hook_error = "RUNTIME_CRASH_FAILED: HOOK-ERROR in before_all: ConnectionError: kubectl proxy is not available"
+    assert validate_twice(monkeypatch, tmp_path, kubectl_error) == 2
+    assert validate_twice(monkeypatch, tmp_path / "hook", hook_error) == 2
+
+
+def test_behave_load_errors_are_reported_as_setup_failures(monkeypatch, tmp_path):
+    load_error = {"passed": False, "crashed": True, "failures": [], "output": "",
+                  "load_error": "Traceback (most recent call last):\n  File \"environment.py\", line 3\nModuleNotFoundError: No module named 'bdd_runtime'"}
+    monkeypatch.setattr(Automation_script, "run_behave", lambda *args, **kwargs: load_error)
+    is_valid, message = Automation_script.run_validation("from behave import given\n", "behave")
+    assert not is_valid
+    assert message.startswith("VALIDATION_SETUP_FAILED")
+    assert not Automation_script.is_cacheable_validation(message)